@@ -12,12 +12,16 @@ import subprocess
 import threading
 import time
 import paho.mqtt.client as mqtt
-import random
+import socket
 
 # Configuration
 CONFIG_FILE = "C:\\Users\\Box\\bridge_config.json"
 BRIDGE_SCRIPT = "C:\\Users\\Box\\hyperion_zigbee_bridge.py"
 
+# Slider drags fire once per pixel; coalesce them before touching disk or MQTT
+SAVE_DEBOUNCE_MS = 250
+PUBLISH_DEBOUNCE_MS = 100
+
 # Vaporwave Palette
 COLORS = {
     "bg": "#2D2B55",       # Deep Navy
@@ -39,12 +43,15 @@ class HyperionCommandCenter:
         self.config = {}
         self.mqtt_client = None
         self.bridge_process = None
+        self._pending_save = None
+        self._pending_publish = {}
         
         self.load_config()
         self.setup_mqtt()
         self.check_bridge_status()
         
         self.create_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     # ================= SYSTEM LOGIC =================
 
@@ -60,14 +67,45 @@ class HyperionCommandCenter:
 
     def save_config(self):
         try:
-            with open(CONFIG_FILE, 'w') as f:
+            # Write to a temp file and swap it in, so the bridge never reads a half-written config
+            tmp = CONFIG_FILE + ".tmp"
+            with open(tmp, 'w') as f:
                 json.dump(self.config, f, indent=4)
+            os.replace(tmp, CONFIG_FILE)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save: {e}")
 
+    def schedule_save(self):
+        if self._pending_save:
+            self.root.after_cancel(self._pending_save)
+        self._pending_save = self.root.after(SAVE_DEBOUNCE_MS, self._flush_save)
+
+    def _flush_save(self):
+        self._pending_save = None
+        self.save_config()
+
+    def debounce_publish(self, key, func, *args):
+        pending = self._pending_publish.get(key)
+        if pending:
+            self.root.after_cancel(pending)
+
+        def fire():
+            self._pending_publish.pop(key, None)
+            func(*args)
+
+        self._pending_publish[key] = self.root.after(PUBLISH_DEBOUNCE_MS, fire)
+
+    def on_close(self):
+        # Don't lose a slider change that is still waiting to be saved
+        if self._pending_save:
+            self.root.after_cancel(self._pending_save)
+            self._flush_save()
+        self.root.destroy()
+
     def setup_mqtt(self):
         try:
-            self.mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"hyp_gui_{random.randint(1000,9999)}")
+            # Stable per-host ID + persistent session avoids broker session churn on every launch
+            self.mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"hyp_gui_{socket.gethostname()}", clean_session=False)
             self.mqtt_client.connect(self.config.get("mqtt_broker", "127.0.0.1"), 1883)
             self.mqtt_client.loop_start()
         except Exception as e:
@@ -212,7 +250,7 @@ class HyperionCommandCenter:
             def on_sync_bright(val, idx=i):
                 v = float(val)
                 self.config["devices"][idx]["brightness_multiplier"] = v
-                self.save_config()
+                self.schedule_save()
             
             scale = tk.Scale(
                 slider_row, from_=0.0, to=1.0, resolution=0.05, orient=tk.HORIZONTAL,
@@ -267,7 +305,7 @@ class HyperionCommandCenter:
                     controls, from_=150, to=370, orient=tk.HORIZONTAL, length=200,
                     bg=COLORS["card"], fg=COLORS["yellow"], highlightthickness=0, showvalue=0,
                     troughcolor=COLORS["bg"],
-                    command=lambda v, idx=i: self.send_manual_temp(idx, v)
+                    command=lambda v, idx=i: self.debounce_publish(("temp", idx), self.send_manual_temp, idx, v)
                 )
                 temp_scale.set(370) # Default mid-warm
                 temp_scale.pack(side=tk.LEFT, padx=10)
@@ -292,7 +330,7 @@ class HyperionCommandCenter:
                 bright_frame, from_=0, to=254, orient=tk.HORIZONTAL,
                 bg=COLORS["card"], fg=COLORS["cyan"], highlightthickness=0, showvalue=0,
                 troughcolor=COLORS["bg"],
-                command=lambda v, idx=i: self.set_manual_brightness(idx, v)
+                command=lambda v, idx=i: self.debounce_publish(("bright", idx), self.set_manual_brightness, idx, v)
             )
             slider.set(254)
             slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
@@ -335,7 +373,7 @@ class HyperionCommandCenter:
 
     def update_setting(self, key, val):
         self.config[key] = val
-        self.save_config()
+        self.schedule_save()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -16,6 +16,7 @@ import subprocess
 import threading
 import time
 import random
+import socket
 from PIL import Image, ImageTk, ImageDraw, ImageEnhance
 import pystray
 try:
@@ -31,6 +32,10 @@ BG_IMAGE = os.path.join(SCRIPT_DIR, "background.jpg")
 ICON_ICO = os.path.join(SCRIPT_DIR, "icon.ico")
 ICON_PNG = os.path.join(SCRIPT_DIR, "icon.png")
 
+# Slider drags fire once per step; coalesce them before touching disk or MQTT
+SAVE_DEBOUNCE_MS = 250
+PUBLISH_DEBOUNCE_MS = 100
+
 # Theme
 THEME = {
     "bg": "#050505",
@@ -43,6 +48,13 @@ THEME = {
     "disabled": "#444444"
 }
 
+def write_config(config):
+    """Atomically write the config: the bridge hot-reloads it and must never see a partial file."""
+    tmp = CONFIG_FILE + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(config, f, indent=4)
+    os.replace(tmp, CONFIG_FILE)
+
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
@@ -365,6 +377,8 @@ class VaporwaveApp(ctk.CTk):
         
         self.config = {}
         self.load_config()
+        self._pending_save = None
+        self._pending_publish = {}
         self.mqtt_client = None
         self.bridge_process = None
         self.hyperion_process = None
@@ -492,8 +506,34 @@ class VaporwaveApp(ctk.CTk):
             self.config = {"devices": []}
 
     def save_config(self):
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(self.config, f, indent=4)
+        write_config(self.config)
+
+    def schedule_save(self):
+        if self._pending_save:
+            self.after_cancel(self._pending_save)
+        self._pending_save = self.after(SAVE_DEBOUNCE_MS, self._flush_save)
+
+    def _flush_save(self):
+        self._pending_save = None
+        self.save_config()
+
+    def debounce_publish(self, key, func, *args):
+        pending = self._pending_publish.get(key)
+        if pending:
+            self.after_cancel(pending)
+
+        def fire():
+            self._pending_publish.pop(key, None)
+            func(*args)
+
+        self._pending_publish[key] = self.after(PUBLISH_DEBOUNCE_MS, fire)
+
+    def destroy(self):
+        # Don't lose a slider change that is still waiting to be saved
+        if self._pending_save:
+            self.after_cancel(self._pending_save)
+            self._flush_save()
+        super().destroy()
 
     def setup_mqtt(self):
         if mqtt is None:
@@ -501,12 +541,14 @@ class VaporwaveApp(ctk.CTk):
             return
 
         try:
+            # Stable per-host ID + persistent session avoids broker session churn on every launch
+            client_id = f"vap_gui_{socket.gethostname()}"
             # Handle version compatibility for CallbackAPIVersion (introduced in paho-mqtt 2.0.0)
             try:
-                self.mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"vap_gui_{random.randint(1000,9999)}")
+                self.mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=False)
             except AttributeError:
                 # Fallback for older paho-mqtt versions (< 2.0.0)
-                self.mqtt_client = mqtt.Client(client_id=f"vap_gui_{random.randint(1000,9999)}")
+                self.mqtt_client = mqtt.Client(client_id=client_id, clean_session=False)
             
             def on_connect(client, userdata, flags, rc, properties=None):
                 if rc == 0:
@@ -674,7 +716,7 @@ class VaporwaveApp(ctk.CTk):
 
                 def slide(v, idx=i):
                     self.config["devices"][idx]["brightness_multiplier"] = v
-                    self.save_config()
+                    self.schedule_save()
 
                     # Smart brightness logic:
                     # - If not synced (enabled=false): Always send MQTT
@@ -682,7 +724,7 @@ class VaporwaveApp(ctk.CTk):
                     # - If synced AND Hyperion running: Don't send (Hyperion will control it)
                     device_enabled = self.config["devices"][idx].get("enabled", False)
                     if not device_enabled or not self.is_hyperion_running():
-                        self.set_manual_brightness(idx, v * 254)
+                        self.debounce_publish(("bright", idx), self.set_manual_brightness, idx, v * 254)
 
                 sw_state = "normal" if is_phys_on else "disabled"
                 sl = ctk.CTkSlider(card, from_=0, to=1, command=lambda v, idx=i: slide(v, idx), state=sw_state,
@@ -715,9 +757,9 @@ class VaporwaveApp(ctk.CTk):
 
                 def slide(v, idx=i):
                     self.config["devices"][idx]["brightness_multiplier"] = v
-                    self.save_config()
-                    # Always send brightness command for immediate feedback
-                    self.set_manual_brightness(idx, v * 254)
+                    self.schedule_save()
+                    # Always send brightness command once the drag settles
+                    self.debounce_publish(("bright", idx), self.set_manual_brightness, idx, v * 254)
 
                 sw_state = "normal" if is_phys_on else "disabled"
                 sl = ctk.CTkSlider(card, from_=0, to=1, command=lambda v, idx=i: slide(v, idx), state=sw_state,
@@ -918,7 +960,7 @@ class VaporwaveApp(ctk.CTk):
                     temp_row,
                     from_=150,
                     to=370,
-                    command=lambda v, idx=i: self.send_manual_temp(idx, v),
+                    command=lambda v, idx=i: self.debounce_publish(("temp", idx), self.send_manual_temp, idx, v),
                     button_color=THEME["yellow"],
                     progress_color=THEME["orange"]
                 )
@@ -934,7 +976,7 @@ class VaporwaveApp(ctk.CTk):
                     bright_row,
                     from_=1,
                     to=254,
-                    command=lambda v, idx=i: self.set_manual_brightness(idx, v),
+                    command=lambda v, idx=i: self.debounce_publish(("bright", idx), self.set_manual_brightness, idx, v),
                     button_color=THEME["cyan"],
                     progress_color=THEME["dim"]
                 )
@@ -947,7 +989,7 @@ class VaporwaveApp(ctk.CTk):
                         self.send_manual_color(device_idx, color)
                         self.update_orb_color(device_idx, color)
                         if brightness is not None:
-                            self.set_manual_brightness(device_idx, brightness)
+                            self.debounce_publish(("bright", device_idx), self.set_manual_brightness, device_idx, brightness)
                     return handler
 
                 picker = VaporwaveColorPicker(
@@ -1245,7 +1287,7 @@ class VaporwaveApp(ctk.CTk):
 
     def update_setting(self, key, val):
         self.config[key] = val
-        self.save_config()
+        self.schedule_save()
         if key == "bg_brightness":
             self.apply_bg_brightness(val)
         elif key == "ui_opacity":
@@ -1370,8 +1412,7 @@ if __name__ == "__main__":
                 client.disconnect()
                 
                 # Save Config State
-                with open(CONFIG_FILE, "w") as f:
-                    json.dump(config, f, indent=4)
+                write_config(config)
                     
             except Exception as e:
                 print(f"[HEADLESS] Error: {e}")
@@ -7,14 +7,36 @@ Captures screen colors from Hyperion and synchronizes Zigbee lights with throttl
 import json
 import time
 import threading
-import random
+import socket
+import zlib
 import websocket
 import paho.mqtt.client as mqtt
 from collections import deque
-from typing import Dict, Tuple, List, Any, Optional
+from typing import Dict, Tuple, List, Any, Optional, Sequence
 
 import os
 
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Optional: falls back to pure-Python averaging
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # Optional: compiles the averaging + warmth kernel when NumPy is present
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads  # Optional: orjson parses ledstream frames faster
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None  # Optional: falls back to a background mtime poller
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -24,6 +46,61 @@ CONFIG_FILE = os.path.join(SCRIPT_DIR, "bridge_config.json")
 config = {}
 last_config_load = 0
 
+# Values derived from config, recomputed only when the config file reloads
+_warmth_cache = {"blue_div": 1.0, "green_factor": 0.0, "throttle": 1.0}
+_publish_targets: List[Tuple[str, bytes]] = []  # (topic, payload template) per active device
+_last_published_rgb: Optional[Tuple[int, int, int]] = None
+_config_generation = 0  # Bumped after every rebuild; tags frames with the settings they used
+# (CRC32, config generation) of the last LED frame the publisher delivered to the lights
+_delivered_frame: Optional[Tuple[int, int]] = None
+
+# Skip publishing when the summed per-channel change is below this (imperceptible on the lights)
+COLOR_DEADBAND = 8
+
+
+def _rebuild_config_cache() -> None:
+    """Precompute warmth coefficients and publish targets from the current config."""
+    global _warmth_cache, _publish_targets, _last_published_rgb, _config_generation
+
+    warmth = config.get("color_warmth", 1.0)
+    # Base Warmth: Reduce Blue. Linearly: at 2.0 warmth, blue is divided by 4
+    blue_div = 1 + (warmth - 1.0) * 3 if warmth > 1.0 else 1.0
+    # Deep Warmth: Reduce Green (shifts Yellow -> Orange -> Red). At 2.0, factor is 0.64
+    green_factor = (warmth - 1.2) * 0.8 if warmth > 1.2 else 0.0
+    _warmth_cache = {
+        "blue_div": blue_div,
+        "green_factor": green_factor,
+        "throttle": config.get("throttle_interval", 1.0),
+    }
+
+    transition_time = config.get("transition_time", 0.1)
+    targets = []
+    for device in config.get("devices", []):
+        # Check both sync-enabled and physical-power-state
+        if not device.get("enabled", True) or not device.get("physical_state", True):
+            continue
+
+        brightness_mult = device.get("brightness_multiplier", 1.0)
+        if brightness_mult == -1:
+            device_brightness = 254
+        else:
+            device_brightness = int(brightness_mult * 254)
+            if device_brightness < 1: device_brightness = 1
+            elif device_brightness > 254: device_brightness = 254
+
+        # Only x/y change per frame; brightness and transition are baked into the template.
+        # Kept as bytes so paho sends the formatted payload without re-encoding it.
+        template = ('{"state":"ON","color":{"x":%a,"y":%a},"brightness":' + str(device_brightness) +
+                    ',"transition":' + json.dumps(transition_time) + '}').encode("utf-8")
+        targets.append((device.get("topic"), template))
+    _publish_targets = targets
+    # Force the next color through the deadband so new settings apply immediately
+    _last_published_rgb = None
+    # Bumped last, after the caches above: a frame tagged with the new generation never
+    # carries old settings, and frames delivered under the old one stop matching the skip
+    _config_generation += 1
+
+
 def load_config() -> bool:
     """
     Load configuration from JSON file.
@@ -40,6 +117,7 @@ def load_config() -> bool:
                 new_config: Dict[str, Any] = json.load(f)
                 config = new_config
                 last_config_load = current_mtime
+                _rebuild_config_cache()
                 print(f"[Config] Loaded settings from {CONFIG_FILE}")
                 return True
     except FileNotFoundError:
@@ -60,6 +138,11 @@ MQTT_BROKER_PORT = config.get("mqtt_port", 1883)
 MQTT_USERNAME = ""
 MQTT_PASSWORD = ""
 
+# Design invariant: color updates are fire-and-forget. Waiting for a PUBACK per
+# message would collapse the publish rate, and a lost frame is superseded by the next.
+# Enforced by publish_color_payload(), the only path color payloads are sent through.
+PUBLISH_QOS = 0
+
 # ============================================================================
 # GLOBALS & STATE
 # ============================================================================
@@ -69,13 +152,65 @@ last_publish_time = 0
 ws_connected = False
 mqtt_connected = False
 stop_event = threading.Event()
+config_changed = threading.Event()  # Set by the config watcher, consumed by the publisher
+pending_colors = deque(maxlen=1)  # Newest color awaiting publish; stale colors are dropped
+color_ready = threading.Event()
 
 
+# ============================================================================
+# CONFIG HOT RELOAD
+# ============================================================================
+
+def _poll_config_mtime() -> None:
+    """Fallback watcher: stat the config file once per second off the hot path."""
+    while not stop_event.wait(1.0):
+        try:
+            if os.path.getmtime(CONFIG_FILE) > last_config_load:
+                config_changed.set()
+        except OSError:
+            pass
+
+
+def start_config_watcher() -> None:
+    """
+    Watch CONFIG_FILE in the background and flag changes via config_changed.
+    Uses OS file notifications through watchdog when installed, otherwise polls.
+    """
+    if Observer is not None:
+        class ConfigFileHandler(FileSystemEventHandler):
+            # Only content changes count; opened/closed events fire on every read,
+            # including load_config() itself
+            def _flag_if_config(self, event):
+                paths = (event.src_path, getattr(event, "dest_path", ""))
+                if any(p and os.path.abspath(p) == CONFIG_FILE for p in paths):
+                    config_changed.set()
+
+            on_modified = _flag_if_config
+            on_created = _flag_if_config
+            # Editors and atomic saves may replace the file instead of modifying it
+            on_moved = _flag_if_config
+
+        observer = Observer()
+        observer.schedule(ConfigFileHandler(), SCRIPT_DIR, recursive=False)
+        observer.daemon = True
+        observer.start()
+        print("[Config] Watching for changes (file notifications)")
+    else:
+        threading.Thread(target=_poll_config_mtime, daemon=True).start()
+        print("[Config] Watching for changes (polling)")
+
 
 # ============================================================================
 # COLOR CONVERSION UTILITIES
 # ============================================================================
 
+# sRGB gamma expansion for every 8-bit channel value, so rgb_to_xy avoids pow() per call
+_GAMMA = [
+    ((v + 0.055) / 1.055) ** 2.4 if v > 0.04045 else v / 12.92
+    for v in (i / 255.0 for i in range(256))
+]
+
+
 def rgb_to_xy(r: int, g: int, b: int) -> Tuple[float, float, int]:
     """
     Convert RGB (0-255) to XY color space (CIE 1931) for Zigbee lights.
@@ -88,20 +223,15 @@ def rgb_to_xy(r: int, g: int, b: int) -> Tuple[float, float, int]:
     Returns:
         Tuple of (x: float, y: float, brightness: int) in Zigbee color space.
     """
-    # Normalize RGB values to 0-1
-    r = r / 255.0
-    g = g / 255.0
-    b = b / 255.0
-
-    # Apply gamma correction
-    r = pow((r + 0.055) / 1.055, 2.4) if r > 0.04045 else r / 12.92
-    g = pow((g + 0.055) / 1.055, 2.4) if g > 0.04045 else g / 12.92
-    b = pow((b + 0.055) / 1.055, 2.4) if b > 0.04045 else b / 12.92
+    # Normalize and gamma-correct via lookup table
+    r = _GAMMA[r]
+    g = _GAMMA[g]
+    b = _GAMMA[b]
 
     # Convert to XYZ
     X = r * 0.649926 + g * 0.103455 + b * 0.197109
     Y = r * 0.234327 + g * 0.743075 + b * 0.022598
-    Z = r * 0.000000 + g * 0.053077 + b * 1.035763
+    Z = g * 0.053077 + b * 1.035763  # Red contributes nothing to Z
 
     # Calculate xy
     total = X + Y + Z
@@ -119,6 +249,78 @@ def rgb_to_xy(r: int, g: int, b: int) -> Tuple[float, float, int]:
     return (round(x, 4), round(y, 4), brightness)
 
 
+def average_led_color(leds: Sequence[int]) -> Tuple[int, int, int]:
+    """
+    Average a flat Hyperion LED array [R, G, B, R, G, B, ...] into one color.
+    Uses a vectorized NumPy reduction when available.
+    
+    Args:
+        leds: Flat list or bytes of 8-bit channel values
+        
+    Returns:
+        Tuple of (r, g, b) integer averages (0-255).
+    """
+    num_leds = len(leds) // 3
+    if num_leds == 0:
+        return (0, 0, 0)
+
+    if np is not None:
+        arr = np.frombuffer(bytes(leds), dtype=np.uint8, count=num_leds * 3).reshape(-1, 3)
+        r, g, b = (arr.sum(axis=0, dtype=np.uint32) // num_leds).tolist()
+        return (r, g, b)
+
+    # Single pass over the list; zip() on one shared iterator yields (R, G, B) triplets
+    r_sum = g_sum = b_sum = 0
+    it = iter(leds)
+    for r, g, b in zip(it, it, it):
+        r_sum += r
+        g_sum += g
+        b_sum += b
+    return (r_sum // num_leds, g_sum // num_leds, b_sum // num_leds)
+
+
+if njit is not None and np is not None:
+    @njit(cache=True)
+    def _avg_warmth_kernel(buf, blue_div, green_factor):
+        """Compiled single-pass average of a uint8 [R, G, B, ...] buffer plus warmth filter."""
+        n = buf.shape[0] // 3
+        if n == 0:
+            return 0, 0, 0
+        rs = gs = bs = 0
+        for i in range(n):
+            rs += buf[3 * i]
+            gs += buf[3 * i + 1]
+            bs += buf[3 * i + 2]
+        r = rs // n
+        g = int((gs // n) * (1.0 - green_factor))
+        b = int((bs // n) / blue_div)
+        return r, g, b
+else:
+    _avg_warmth_kernel = None
+
+
+def average_warm_color(leds: Sequence[int]) -> Tuple[int, int, int]:
+    """
+    Average a flat LED array and apply the cached color warmth filter.
+    Runs as one compiled kernel when Numba is available.
+    
+    Args:
+        leds: Flat list or bytes of 8-bit channel values
+        
+    Returns:
+        Tuple of (r, g, b); green and blue may fall outside 0-255 and need clamping.
+    """
+    warmth = _warmth_cache
+    if _avg_warmth_kernel is not None:
+        return _avg_warmth_kernel(np.frombuffer(bytes(leds), dtype=np.uint8),
+                                  warmth["blue_div"], warmth["green_factor"])
+
+    r, g, b = average_led_color(leds)
+    b = int(b / warmth["blue_div"])
+    g = int(g * (1.0 - warmth["green_factor"]))
+    return (r, g, b)
+
+
 # ============================================================================
 # MQTT CLIENT SETUP
 # ============================================================================
@@ -134,10 +336,20 @@ def on_mqtt_connect(client: mqtt.Client, userdata: Any, flags: Dict, rc: int, pr
         rc: Return code (0 = success)
         properties: MQTT v5 properties (optional)
     """
-    global mqtt_connected
+    global mqtt_connected, _delivered_frame, _last_published_rgb
     if rc == 0:
         mqtt_connected = True
+        # Re-send the current frame after (re)connecting even if the screen is static:
+        # paho drops queued QoS 0 packets on reconnect, so the last color may never have arrived.
+        # Clear both the repeated-frame skip and the deadband so it goes out again.
+        _delivered_frame = None
+        _last_published_rgb = None
         print(f"[MQTT] Connected to broker at {MQTT_BROKER_HOST}:{MQTT_BROKER_PORT}")
+        # Disable Nagle so each small color publish is sent immediately, not delayed for coalescing
+        try:
+            client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (AttributeError, OSError) as e:
+            print(f"[MQTT] Could not set TCP_NODELAY: {e}")
     else:
         mqtt_connected = False
         print(f"[MQTT] Connection failed with code {rc}")
@@ -160,12 +372,18 @@ def on_mqtt_disconnect(client: mqtt.Client, userdata: Any, disconnect_flags: Any
         print(f"[MQTT] Unexpected disconnection (code {rc}). Will auto-reconnect...")
 
 
-mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"hyperion_bridge_{random.randint(1000,9999)}")
+# Stable per-host client ID with a persistent session, so restarts resume the broker-side
+# session instead of creating and tearing down a new one each time
+mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"hyperion_bridge_{socket.gethostname()}", clean_session=False)
 mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
 mqtt_client.on_connect = on_mqtt_connect
 mqtt_client.on_disconnect = on_mqtt_disconnect
 # Increase keep-alive to prevent disconnections
 mqtt_client._keepalive = 120  # 2 minutes
+# These limits only apply to QoS > 0 publishes, so they do nothing for QoS 0 color updates.
+# Kept as a guard; the backlog is actually bounded by the want_write() gate in mqtt_publish_worker.
+mqtt_client.max_queued_messages_set(1)
+mqtt_client.max_inflight_messages_set(1)
 
 
 def mqtt_connect() -> None:
@@ -187,7 +405,27 @@ def mqtt_connect() -> None:
             time.sleep(3)
 
 
-def mqtt_publish_color(r: int, g: int, b: int) -> None:
+def publish_color_payload(topic: str, payload: bytes, qos: int = PUBLISH_QOS) -> mqtt.MQTTMessageInfo:
+    """
+    Send one color payload. All color publishes must go through here.
+    
+    Args:
+        topic: Zigbee2MQTT device topic
+        payload: Serialized JSON payload
+        qos: MQTT QoS level; anything other than PUBLISH_QOS is rejected
+        
+    Returns:
+        The paho MQTTMessageInfo for the publish.
+        
+    Raises:
+        ValueError: If qos is not PUBLISH_QOS (see ARCHITECTURE.md, MQTT Bridge).
+    """
+    if qos != PUBLISH_QOS:
+        raise ValueError(f"Color publishes must use QoS {PUBLISH_QOS}, got QoS {qos}")
+    return mqtt_client.publish(topic, payload, qos=PUBLISH_QOS)
+
+
+def mqtt_publish_color(r: int, g: int, b: int) -> bool:
     """
     Publish color to all configured Zigbee2MQTT lights with individual brightness settings.
     
@@ -195,11 +433,21 @@ def mqtt_publish_color(r: int, g: int, b: int) -> None:
         r: Red value (0-255)
         g: Green value (0-255)
         b: Blue value (0-255)
+        
+    Returns:
+        bool: True if the lights now show this color (published, or within the deadband).
     """
-    global mqtt_client, mqtt_connected, config
+    global mqtt_client, mqtt_connected, config, _last_published_rgb
+
+    # Apply config updates flagged by the watcher
+    if config_changed.is_set():
+        config_changed.clear()
+        load_config()
 
-    # Check for config updates
-    load_config()
+    # Deadband: skip colors that barely differ from what the lights already show
+    last = _last_published_rgb
+    if last is not None and abs(r - last[0]) + abs(g - last[1]) + abs(b - last[2]) < COLOR_DEADBAND:
+        return True
 
     # Ensure MQTT is connected before publishing
     if not mqtt_connected:
@@ -210,46 +458,50 @@ def mqtt_publish_color(r: int, g: int, b: int) -> None:
         # Convert RGB to XY color space for Zigbee lights
         x, y, _ = rgb_to_xy(r, g, b)  # Ignore brightness from conversion
 
-        # Publish to all configured devices
-        published_count = 0
-        devices = config.get("devices", [])
-        transition_time = config.get("transition_time", 0.1)
-
-        for device in devices:
-            # Check both sync-enabled and physical-power-state
-            if not device.get("enabled", True) or not device.get("physical_state", True):
-                continue
-            
-            topic = device.get("topic")
-            brightness_mult = device.get("brightness_multiplier", 1.0)
-            
-            # Calculate brightness
-            if brightness_mult == -1:
-                device_brightness = 254
-            else:
-                device_brightness = int(brightness_mult * 254)
-                if device_brightness < 1: device_brightness = 1
-                elif device_brightness > 254: device_brightness = 254
-
-            payload = {
-                "state": "ON",
-                "color": {"x": x, "y": y},
-                "brightness": device_brightness,
-                "transition": transition_time
-            }
-            payload_str = json.dumps(payload)
+        # Serialize every payload up front, then publish back-to-back so the
+        # MQTT network thread can flush them together
+        messages = [(topic, template % (x, y)) for topic, template in _publish_targets]
 
+        published_count = 0
+        for topic, payload in messages:
             try:
-                result = mqtt_client.publish(topic, payload_str, qos=0)
+                result = publish_color_payload(topic, payload)
                 if result.rc == mqtt.MQTT_ERR_SUCCESS:
                     published_count += 1
             except Exception as e:
                 print(f"[MQTT] Publish error to {topic}: {e}")
 
         if published_count > 0:
-            pass # Suppress log spam for cleaner output, or logging could be added back if needed
+            _last_published_rgb = (r, g, b)
+            return True
     else:
         print("[MQTT] Cannot publish - broker not connected")
+    return False
+
+
+def mqtt_publish_worker() -> None:
+    """
+    Single writer thread: publish the newest pending color off the WebSocket thread.
+    Colors arriving while a publish is in progress or the socket is backed up
+    replace each other in pending_colors. Only frames that actually reached the
+    lights are recorded for the WebSocket handler's repeated-frame skip.
+    """
+    global _delivered_frame
+    while not stop_event.is_set():
+        # Broker backpressure: while the previous batch is still unsent, keep
+        # waiting so newer colors replace the pending one instead of piling up
+        if mqtt_connected and mqtt_client.want_write():
+            stop_event.wait(0.01)
+            continue
+
+        try:
+            r, g, b, frame_key = pending_colors.popleft()
+        except IndexError:
+            color_ready.wait(0.1)
+            color_ready.clear()
+            continue
+        if mqtt_publish_color(r, g, b):
+            _delivered_frame = frame_key
 
 
 # ============================================================================
@@ -279,7 +531,7 @@ def on_ws_message(ws, message):
     global latest_color, last_publish_time
 
     try:
-        data = json.loads(message)
+        data = _json_loads(message)
 
         # Check if this is a ledcolors-ledstream-update message
         if data.get("command") == "ledcolors-ledstream-update":
@@ -288,29 +540,16 @@ def on_ws_message(ws, message):
             leds = led_data.get("leds", [])
 
             if leds and len(leds) >= 3:
-                # Calculate average color from all configured LEDs
-                num_leds = len(leds) // 3
-                if num_leds > 0:
-                    r_avg = sum(leds[i] for i in range(0, len(leds), 3)) // num_leds
-                    g_avg = sum(leds[i] for i in range(1, len(leds), 3)) // num_leds
-                    b_avg = sum(leds[i] for i in range(2, len(leds), 3)) // num_leds
-                    r, g, b = r_avg, g_avg, b_avg
-                else:
-                    r, g, b = 0, 0, 0
-
-                # Apply color warmth filter
-                warmth = config.get("color_warmth", 1.0)
-                
-                # Base Warmth: Reduce Blue
-                if warmth > 1.0:
-                    # Linearly reduce blue: at 2.0 warmth, blue is divided by 4
-                    b = int(b / (1 + (warmth - 1.0) * 3))
-                
-                # Deep Warmth: Reduce Green (shifts Yellow -> Orange -> Red)
-                if warmth > 1.2:
-                    # Start reducing green slightly to remove "lime" tints
-                    factor = (warmth - 1.2) * 0.8  # at 2.0, factor is 0.64
-                    g = int(g * (1.0 - factor))
+                # Static content repeats the same frame; skip it once it has reached the
+                # lights under the current settings, unless a config change is pending.
+                # Read the generation before the warmth cache so the key is never newer.
+                frame = bytes(leds)
+                frame_key = (zlib.crc32(frame), _config_generation)
+                if frame_key == _delivered_frame and not config_changed.is_set():
+                    return
+
+                # Calculate average color from all configured LEDs and apply color warmth filter
+                r, g, b = average_warm_color(frame)
 
                 # Ensure bounds
                 r = min(255, max(0, r))
@@ -321,10 +560,12 @@ def on_ws_message(ws, message):
                 latest_color = {"r": r, "g": g, "b": b}
 
                 # Apply non-blocking throttle
-                throttle_interval = config.get("throttle_interval", 1.0)
+                throttle_interval = _warmth_cache["throttle"]
                 current_time = time.time()
                 if current_time - last_publish_time >= throttle_interval:
-                    mqtt_publish_color(r, g, b)
+                    # Hand off to the publisher thread so this handler never blocks on MQTT
+                    pending_colors.append((r, g, b, frame_key))
+                    color_ready.set()
                     last_publish_time = current_time
 
     except json.JSONDecodeError as e:
@@ -363,7 +604,9 @@ def websocket_connect():
                 on_error=on_ws_error,
                 on_close=on_ws_close
             )
-            ws.run_forever(reconnect=5)  # Auto-reconnect every 5 seconds if closed
+            # Skip websocket-client's pure-Python per-byte UTF-8 check on every ~60 FPS frame;
+            # messages then arrive as raw bytes, which json.loads parses directly
+            ws.run_forever(reconnect=5, skip_utf8_validation=True)  # Auto-reconnect every 5 seconds if closed
         except Exception as e:
             print(f"[WebSocket] Connection error: {e}. Retrying in 5 seconds...")
             if not stop_event.is_set():
@@ -398,10 +641,16 @@ def main():
     print("=" * 70)
     print()
 
+    start_config_watcher()
+
     # Start MQTT connection in background thread
     mqtt_thread = threading.Thread(target=mqtt_connect, daemon=True)
     mqtt_thread.start()
 
+    # Start MQTT publisher thread
+    publish_thread = threading.Thread(target=mqtt_publish_worker, daemon=True)
+    publish_thread.start()
+
     # Start WebSocket connection (this blocks in run_forever)
     try:
         websocket_connect()